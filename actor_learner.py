@@ -0,0 +1,171 @@
+import os
+import time
+import queue
+import numpy as np
+import multiprocessing as mp
+from player import RLPlayer
+from vecgame import VecGame
+from symmetry import DIGITS
+from hogwild import shared_qtable
+from evaluate import exact_rates
+from qtable import save_qtable
+
+## actor/learner training: actor processes play self-play episodes with a periodically refreshed copy
+## of the policy and stream them through a bounded queue, the learner applies the SARSA updates of the
+## scripts to whole batches of episodes and publishes its table back to the actors
+
+def play_chunk(qtable,n_episodes,epsilon,rng):
+    ## n_episodes epsilon-greedy self-play games in lockstep, returns per game the state codes and
+    ## actions of every ply (-1 after the end), the number of plies and the winner (0 for a draw)
+    games = VecGame(n_episodes,rng)
+    states = np.full((n_episodes,9),-1,dtype=np.int64)
+    actions = np.full((n_episodes,9),-1,dtype=np.int8)
+    lengths = np.zeros(n_episodes,dtype=np.int8)
+    winners = np.zeros(n_episodes,dtype=np.int8)
+    running = np.ones(n_episodes,dtype=bool)
+    for ply in range(9):
+        live = games.index[running]
+        codes = games.state_index()
+        moves = games.greedy_actions(qtable[codes])
+        moves = np.where(rng.random(n_episodes) < epsilon,games.random_actions(),moves)
+        states[live,ply] = codes[live]
+        actions[live,ply] = moves[live]
+        games.make_moves(moves[live],live)
+        lengths[live] += 1
+        done,winner = games.game_status()
+        winners[running & done] = winner[running & done]
+        running &= ~done
+        if not running.any():
+            break
+    return states,actions,lengths,winners
+
+def actor(shm_name,symmetric,compact,actor_id,chunk,episodes,trajectories,version,lock,stop,seed,
+          epsilon,epsilon_decay,min_epsilon,refresh_interval):
+    rng = np.random.default_rng(seed + actor_id)
+    shared,shm = shared_qtable(symmetric,shm_name,compact)
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact) # local snapshot of the learner's table
+    policy_version = -1
+    for n in range(episodes//chunk):
+        if stop.is_set():
+            break
+        if n % refresh_interval == 0:
+            with lock:
+                rlplayer.qtable.values[:] = shared.values
+                policy_version = version.value
+        batch = play_chunk(rlplayer.qtable,chunk,epsilon,rng)
+        while not stop.is_set():
+            try:
+                trajectories.put((policy_version,*batch),timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        epsilon = max(epsilon*epsilon_decay**chunk,min_epsilon)
+    del shared
+    shm.close()
+
+class Learner:
+    def __init__(self,rlplayer,on_policy=False,alpha=0.1,gamma=0.99):
+        self.rlplayer = rlplayer
+        self.on_policy = on_policy
+        self.alpha = alpha
+        self.gamma = gamma
+
+    def update(self,states,actions,lengths,winners):
+        qtable = self.rlplayer.qtable
+        last = lengths[:,None] - 1
+        ply = np.arange(9)[None,:]
+
+        ## non-terminal plies bootstrap from the next position of the same game
+        moving = ply < last
+        s,a = states[:,:-1][moving[:,:-1]],actions[:,:-1][moving[:,:-1]]
+        next_s = states[:,1:][moving[:,:-1]]
+        if self.on_policy:
+            na = actions[:,1:][moving[:,:-1]]
+        else:
+            na = np.where(DIGITS[next_s] == 0,qtable[next_s],-np.inf).argmax(axis=1)
+        qtable.update(s,a,-self.gamma*qtable.get(next_s,na),self.alpha)
+
+        ## last move of each game gets the result, the move before it the opposite
+        reward = (winners != 0).astype(np.float64) # the last mover won or it is a draw
+        rows = np.arange(len(lengths))
+        closing = lengths >= 2
+        qtable.update(np.concatenate([states[rows,lengths-1],states[rows,lengths-2][closing]]),
+                      np.concatenate([actions[rows,lengths-1],actions[rows,lengths-2][closing]]),
+                      np.concatenate([reward,-reward[closing]]),self.alpha)
+
+def train_actor_learner(n_actors=None,epochs=200000,on_policy=False,symmetric=True,compact=False,alpha=0.1,gamma=0.99,
+                        epsilon=1.0,epsilon_decay=0.9999885,min_epsilon=0.1,seed=0,chunk=64,
+                        queue_size=32,learner_batch=8,publish_interval=4,refresh_interval=4,
+                        report_interval=10000,verbose=True):
+    ## chunk: episodes per queue item, learner_batch: queue items per update, the learner publishes its
+    ## table every publish_interval updates and actors pick it up every refresh_interval chunks
+    n_actors = n_actors or max(os.cpu_count() - 1,1)
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact)
+    learner = Learner(rlplayer,on_policy,alpha,gamma)
+    shared,shm = shared_qtable(symmetric,compact=compact)
+    trajectories = mp.Queue(maxsize=queue_size)
+    version = mp.Value('q',0,lock=False)
+    lock = mp.Lock()
+    stop = mp.Event()
+    per_actor = -(-epochs//n_actors)
+    actors = [mp.Process(target=actor,args=(shm.name,symmetric,compact,i,chunk,per_actor,trajectories,version,lock,stop,
+                                            seed,epsilon,epsilon_decay**n_actors,min_epsilon,refresh_interval))
+              for i in range(n_actors)]
+    history = [] # (seconds, episodes, queue depth, mean staleness, rl wins as first, rl wins as second)
+
+    start = time.time()
+    episodes,updates,next_report = 0,0,report_interval
+    staleness = []
+    try:
+        for p in actors:
+            p.start()
+        while episodes < epochs:
+            batch = []
+            while len(batch) < learner_batch and episodes + len(batch)*chunk < epochs:
+                try:
+                    batch.append(trajectories.get(timeout=1.0))
+                except queue.Empty:
+                    if not any(p.is_alive() for p in actors):
+                        break
+            if not batch:
+                break
+            learner.update(*(np.concatenate(parts) for parts in zip(*[item[1:] for item in batch])))
+            episodes += sum(len(item[4]) for item in batch)
+            staleness.extend(version.value - item[0] for item in batch)
+            updates += 1
+
+            if updates % publish_interval == 0:
+                with lock:
+                    shared.values[:] = rlplayer.qtable.values
+                    version.value += 1
+
+            if episodes >= next_report:
+                next_report += report_interval
+                try:
+                    depth = trajectories.qsize()
+                except NotImplementedError: # macOS
+                    depth = -1
+                wins_rl = exact_rates(rlplayer,"random")[0]
+                history.append((time.time() - start,episodes,depth,float(np.mean(staleness)),*wins_rl))
+                staleness = []
+                if verbose:
+                    print(f"{history[-1][0]:.1f}s, {episodes} episodes, queue depth = {depth}, "
+                          f"staleness = {history[-1][3]:.2f} versions, rl wins = {wins_rl}")
+    finally:
+        stop.set()
+        while any(p.is_alive() for p in actors): # unblock actors waiting on a full queue
+            try:
+                trajectories.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for p in actors:
+            if p.pid is not None:
+                p.join()
+        del shared
+        shm.close()
+        shm.unlink()
+    return rlplayer,history
+
+if __name__ == "__main__":
+    rlplayer,history = train_actor_learner()
+    save_qtable(rlplayer.qtable,"q_table_sarsa_actor_learner_v1.qtable")
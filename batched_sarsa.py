@@ -0,0 +1,108 @@
+import numpy as np
+from player import RLPlayer, match_maker
+from vecgame import VecGame
+from test import plot_service
+from qtable import save_qtable
+from metrics import MetricsWriter
+
+class BatchedSarsa:
+    ## the update rules of onpol_sarsa.py/offpol_sarsa.py applied to n_games self-play games at once:
+    ## every step plays one move in each game and writes all Q updates in one batched call
+    def __init__(self,rlplayer,n_games=256,on_policy=False,alpha=0.1,gamma=0.99,
+                 epsilon=1.0,epsilon_decay=0.9999885,min_epsilon=0.1,rng=None):
+        self.rlplayer = rlplayer
+        self.on_policy = on_policy
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.min_epsilon = min_epsilon
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.games = VecGame(n_games,self.rng)
+        self.prev_state = np.full(n_games,-1) # last move of the other player, -1 at the start of a game
+        self.prev_action = np.full(n_games,-1)
+        self.next_action = np.full(n_games,-1) # on-policy: action already chosen for this position
+        self.episodes = 0
+
+    def epsilon_greedy(self,states):
+        actions = self.games.greedy_actions(self.rlplayer.qtable[states])
+        explore = self.rng.random(len(states)) < self.epsilon
+        return np.where(explore,self.games.random_actions(),actions)
+
+    def step(self):
+        qtable = self.rlplayer.qtable
+        games = self.games
+        states = games.state_index()
+        player = games.current_player.copy() ## the player who takes the action
+
+        actions = self.epsilon_greedy(states)
+        if self.on_policy:
+            actions = np.where(self.next_action >= 0,self.next_action,actions)
+
+        games.make_moves(actions)
+        done,winner = games.game_status()
+        next_states = games.state_index()
+
+        reward = np.where(winner == 0,0,np.where(winner == player,1,-1)) # only non-zero when done
+        na = self.epsilon_greedy(next_states) if self.on_policy else games.greedy_actions(qtable[next_states])
+        na = np.where(done,0,na) # full boards have no next action
+        targets = np.where(done,reward,reward - self.gamma*qtable.get(next_states,na))
+
+        ## the finished game's loser gets the opposite reward for its last move
+        closing = done & (self.prev_state >= 0)
+        qtable.update(np.concatenate([states,self.prev_state[closing]]),
+                      np.concatenate([actions,self.prev_action[closing]]),
+                      np.concatenate([targets,-reward[closing]]),self.alpha)
+
+        self.prev_state = np.where(done,-1,states)
+        self.prev_action = np.where(done,-1,actions)
+        self.next_action = np.where(done,-1,na) if self.on_policy else self.next_action
+        games.reset(done)
+
+        finished = int(done.sum())
+        self.episodes += finished
+        self.epsilon = max(self.epsilon*self.epsilon_decay**finished,self.min_epsilon)
+        return finished
+
+    def train(self,episodes):
+        target = self.episodes + episodes
+        while self.episodes < target:
+            self.step()
+
+def random_match_rates(rlplayer,n_test_games):
+    ## same numbers as the evaluation block of the SARSA scripts
+    match = match_maker()
+    x_wins_1,draws_1,o_wins_1 = match.create_random_matches(-1,rlplayer,n_test_games)
+    x_wins_2,draws_2,o_wins_2 = match.create_random_matches(1,rlplayer,n_test_games)
+    wins_rl = (x_wins_1*100/n_test_games,o_wins_2*100/n_test_games)
+    wins_pl = (x_wins_2*100/n_test_games,o_wins_1*100/n_test_games)
+    draws = (draws_1*100/n_test_games,draws_2*100/n_test_games)
+    return wins_rl,wins_pl,draws
+
+if __name__ == "__main__":
+    epochs = 200000
+    test_interval = 5000
+    n_games = 256
+    n_test_games = 100
+    on_policy = False
+    symmetric = True ## one row per rotation/reflection class of states
+    compact = False ## one row per reachable position (needs symmetric = False)
+
+    q_table_sarsa = "q_table_sarsa_batched_v1.qtable"
+    metrics_sarsa = "metrics_sarsa_batched_v1.metrics"
+    plot_sarsa = "plot_sarsa_batched_v1.png"
+
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact)
+    trainer = BatchedSarsa(rlplayer,n_games=n_games,on_policy=on_policy)
+    plotter = plot_service()
+    metrics = MetricsWriter(metrics_sarsa)
+    while trainer.episodes < epochs:
+        trainer.train(test_interval)
+        wins_rl,wins_pl,draws = random_match_rates(rlplayer,n_test_games)
+        print(f"{trainer.episodes} episodes, epsilon = {trainer.epsilon:.3f}, rl wins = {wins_rl}")
+
+        save_qtable(rlplayer.qtable,q_table_sarsa)
+        metrics.write(trainer.episodes,wins_rl,wins_pl,draws)
+        plotter.plot(metrics_sarsa,plot_sarsa)
+    metrics.close()
+    plotter.close()
@@ -0,0 +1,37 @@
+import os
+import sys
+import subprocess
+
+## import time of the modules worker processes and the GUI start from, each in a fresh interpreter;
+## exits with 1 if one of them pulls in torch: python bench_startup.py [runs]
+
+MODULES = ("game","player","qtable","evaluate","trainer","hogwild","actor_learner")
+TORCH_FREE = ("game","player") # never allowed to load torch
+
+PROBE = """import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "torch" in sys.modules)
+"""
+
+def import_time(module,runs=3):
+    ## best of runs: (seconds, whether torch got imported)
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable,"-c",PROBE.format(module=module)],cwd=here,
+                             capture_output=True,text=True,check=True).stdout.split()
+        results.append((float(out[0]),out[1] == "True"))
+    return min(results)
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failed = []
+    for module in MODULES:
+        seconds,torch_loaded = import_time(module,runs)
+        print(f"{module:15s} {1000*seconds:8.1f} ms{'  imports torch' if torch_loaded else ''}")
+        if torch_loaded and module in TORCH_FREE:
+            failed.append(module)
+    if failed:
+        print(f"FAIL: importing {', '.join(failed)} loads torch")
+        sys.exit(1)
@@ -0,0 +1,202 @@
+import sys
+import copy
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+from player import RLPlayer
+from nnplayer import NNRLPlayer, ENCODING, network_values
+from vecgame import VecGame
+from replay import ReplayBuffer, PrioritizedReplayBuffer
+from qtable import QTable, save_qtable
+from symmetry import SymmetricQTable, CLASS_ID, N_CLASSES
+from solver import solved_game
+from evaluate import exact_rates
+
+## DQN for NNRLPlayer: n_games self-play games in lockstep feed an array replay buffer of state codes,
+## minibatches are turned into network inputs with one table lookup into preallocated tensors and
+## trained against a periodically synced target network, with illegal moves masked out everywhere
+
+def nn_qtable(net):
+    ## the network's action values for every state code in one forward pass
+    values = network_values(net,ENCODING)
+    qtable = QTable()
+    qtable.values[:] = values
+    return qtable
+
+class DQNTrainer:
+    def __init__(self,net=None,n_games=32,cap=50000,batch_size=256,lr=1e-3,gamma=0.99,
+                 epsilon=1.0,epsilon_decay=0.9995,min_epsilon=0.1,target_update=100,updates_per_step=2,
+                 prioritized=False,num_threads=None,device="cpu",rng=None):
+        ## num_threads sets torch.set_num_threads, with device other than "cpu" minibatches are staged
+        ## in pinned host memory and copied asynchronously
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.device = torch.device(device)
+        self.net = (net if net is not None else NNRLPlayer()).to(self.device)
+        self.target = copy.deepcopy(self.net)
+        self.target.requires_grad_(False)
+        self.optimizer = torch.optim.Adam(self.net.parameters(),lr=lr)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.buffer = (PrioritizedReplayBuffer if prioritized else ReplayBuffer)(cap,self.rng)
+        self.batch_size = batch_size
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        self.min_epsilon = min_epsilon
+        self.target_update = target_update
+        self.updates_per_step = updates_per_step
+
+        self.games = VecGame(n_games,self.rng)
+        self.prev_state = np.full(n_games,-1) # last move of the other player, -1 at the start of a game
+        self.prev_action = np.full(n_games,-1)
+        self.episodes = 0
+        self.updates = 0
+
+        ## host buffers are written in place through their numpy views
+        pin = self.device.type != "cpu"
+        def host(shape,dtype):
+            tensor = torch.empty(shape,dtype=dtype)
+            return tensor.pin_memory() if pin else tensor
+        self.play_inputs = host((n_games,9),torch.float32)
+        self.states = host((batch_size,9),torch.float32)
+        self.next_states = host((batch_size,9),torch.float32)
+        self.next_legal = host((batch_size,9),torch.bool)
+        self.actions = host(batch_size,torch.int64)
+        self.rewards = host(batch_size,torch.float32)
+        self.dones = host(batch_size,torch.bool)
+        self.weights = host(batch_size,torch.float32)
+
+    def to_device(self,tensor):
+        return tensor.to(self.device,non_blocking=True)
+
+    def act(self,codes):
+        ## epsilon-greedy masked argmax over the legal moves of every game
+        np.take(ENCODING,codes,axis=0,out=self.play_inputs.numpy())
+        with torch.inference_mode():
+            values = self.net(self.to_device(self.play_inputs)).cpu().numpy()
+        actions = self.games.greedy_actions(values)
+        explore = self.rng.random(len(codes)) < self.epsilon
+        return np.where(explore,self.games.random_actions(),actions)
+
+    def step(self):
+        ## one move in every game, its transitions go to the buffer, then updates_per_step minibatches
+        games = self.games
+        states = games.state_index()
+        player = games.current_player.copy() ## the player who takes the action
+        actions = self.act(states)
+
+        games.make_moves(actions)
+        done,winner = games.game_status()
+        next_states = games.state_index()
+        reward = np.where(winner == 0,0,np.where(winner == player,1,-1)) # only non-zero when done
+        next_legal = games.legal_mask() & ~done[:,None]
+
+        ## the finished game's loser gets the opposite reward for its last move
+        closing = done & (self.prev_state >= 0)
+        self.buffer.add(np.concatenate([states,self.prev_state[closing]]),
+                        np.concatenate([actions,self.prev_action[closing]]),
+                        np.concatenate([reward,-reward[closing]]),
+                        np.concatenate([next_states,next_states[closing]]),
+                        np.concatenate([done,done[closing]]),
+                        np.concatenate([next_legal,next_legal[closing]]))
+
+        self.prev_state = np.where(done,-1,states)
+        self.prev_action = np.where(done,-1,actions)
+        games.reset(done)
+
+        finished = int(done.sum())
+        self.episodes += finished
+        self.epsilon = max(self.epsilon*self.epsilon_decay**finished,self.min_epsilon)
+
+        if len(self.buffer) >= self.batch_size:
+            for _ in range(self.updates_per_step):
+                self.learn()
+        return finished
+
+    def learn(self):
+        slots,states,actions,rewards,next_states,dones,next_legal,weights = self.buffer.sample(self.batch_size)
+        np.take(ENCODING,states,axis=0,out=self.states.numpy())
+        np.take(ENCODING,next_states,axis=0,out=self.next_states.numpy())
+        self.next_legal.numpy()[:] = next_legal
+        self.actions.numpy()[:] = actions
+        self.rewards.numpy()[:] = rewards
+        self.dones.numpy()[:] = dones
+        self.weights.numpy()[:] = weights
+        states,next_states,next_legal,actions,rewards,dones,weights = map(self.to_device,(
+            self.states,self.next_states,self.next_legal,self.actions,self.rewards,self.dones,self.weights))
+
+        ## negamax target: reward - gamma*best legal value of the opponent in the next position
+        with torch.no_grad():
+            next_values = self.target(next_states).masked_fill(~next_legal,-torch.inf).max(dim=1).values
+            targets = rewards - self.gamma*torch.where(dones,0.0,next_values)
+        values = self.net(states).gather(1,actions[:,None]).squeeze(1)
+        loss = (weights*F.smooth_l1_loss(values,targets,reduction="none")).mean()
+        self.optimizer.zero_grad(set_to_none=True)
+        loss.backward()
+        self.optimizer.step()
+
+        self.buffer.update_priorities(slots,(targets - values).detach().cpu().numpy())
+        self.updates += 1
+        if self.updates % self.target_update == 0:
+            self.target.load_state_dict(self.net.state_dict())
+        return loss.item()
+
+    def train(self,episodes):
+        target = self.episodes + episodes
+        while self.episodes < target:
+            self.step()
+
+def nn_rates(net,opponent="random"):
+    ## exact_rates of the network's greedy policy
+    rlplayer = RLPlayer()
+    rlplayer.qtable = nn_qtable(net)
+    return exact_rates(rlplayer,opponent)
+
+def distill(net,symmetric=False):
+    ## the network's values of every reachable state from one batch, as a QTable that reproduces its
+    ## moves exactly, or symmetric: one row per canonical state averaging the values of its rotations
+    ## and reflections (1/8 of the size, the network itself is not symmetric so a few moves change)
+    codes = np.flatnonzero(solved_game().reachable)
+    values = network_values(net,ENCODING[codes])
+    if not symmetric:
+        qtable = QTable()
+        qtable[codes] = values
+        return qtable
+    qtable = SymmetricQTable()
+    qtable.add(np.repeat(codes,9),np.tile(np.arange(9),len(codes)),values.reshape(-1)) # in the canonical frame
+    qtable.values /= np.maximum(np.bincount(CLASS_ID[codes],minlength=N_CLASSES),1)[:,None]
+    return qtable
+
+def export_qtable(net,file_name,symmetric=False,dtype=None):
+    ## distill() written in the binary format load_qtable/RLPlayer read, no torch needed to serve it
+    save_qtable(distill(net,symmetric),file_name,dtype)
+
+def train_dqn(epochs=30000,eval_interval=2000,target_rate=None,seed=0,verbose=True,**params):
+    ## DQNTrainer for epochs episodes (or until the rl player wins or draws target_rate percent in both
+    ## seats against the random player), returns the network and (seconds, episodes, rl wins) history
+    torch.manual_seed(seed)
+    trainer = DQNTrainer(rng=np.random.default_rng(seed),**params)
+    history = []
+    start = time.time()
+    while trainer.episodes < epochs:
+        trainer.train(eval_interval)
+        wins_rl,_,draws = nn_rates(trainer.net)
+        history.append((time.time() - start,trainer.episodes,wins_rl))
+        if verbose:
+            print(f"{history[-1][0]:.1f}s, {trainer.episodes} episodes, epsilon = {trainer.epsilon:.3f}, "
+                  f"rl wins = {wins_rl}, draws = {draws}")
+        if target_rate is not None and min(w + d for w,d in zip(wins_rl,draws)) >= target_rate:
+            break
+    return trainer.net,history
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2: ## export a trained network: python dqn.py nn_dqn_v1.pt nn_dqn_v1.qtable
+        net = NNRLPlayer()
+        net.load_state_dict(torch.load(sys.argv[1]))
+    else:
+        net,history = train_dqn()
+        torch.save(net.state_dict(),"nn_dqn_v1.pt")
+    file_name = sys.argv[2] if len(sys.argv) > 2 else "nn_dqn_v1.qtable"
+    export_qtable(net,file_name)
+    print(f"Wrote {file_name}")
@@ -0,0 +1,142 @@
+import copy
+import numpy as np
+import queue
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from game import Game
+from solver import solved_game
+from states import reachable_states
+
+## exact evaluation of the greedy Q-table policy: the outcome probabilities (player 1 wins, draw,
+## player -1 wins) of every reachable position are computed ply by ply from the end of the game
+
+def greedy_move(qtable,game:Game):
+    all_actions = qtable[game.state_index()]
+    legal_moves = game.legal_moves()
+    action = legal_moves[0]
+    for move in legal_moves:
+        if all_actions[move] > all_actions[action]:
+            action = move
+    return action
+
+def match_probabilities(rlplayer,rl_side,opponent="random"):
+    ## (player 1 wins, draw, player -1 wins) with the RL player on rl_side against "random" or "perfect"
+    states = reachable_states()
+    outcomes = np.zeros((len(states),3))
+    final = np.flatnonzero(states.terminal)
+    outcomes[final,1 - states.winner[final]] = 1.0
+    for ply in range(8,-1,-1):
+        ids = np.arange(states.ply_start[ply],states.ply_start[ply+1])
+        ids = ids[~states.terminal[ids]]
+        codes = states.codes[ids].astype(np.int64)
+        children = states.children[ids]
+        if states.player[ids[0]] == rl_side or opponent == "perfect":
+            if states.player[ids[0]] == rl_side: # greedy move, lowest cell on ties like greedy_move
+                moves = np.where(states.legal_mask[ids],rlplayer.qtable[codes],-np.inf).argmax(axis=1)
+            else:
+                moves = solved_game().best_moves(codes)
+            outcomes[ids] = outcomes[children[np.arange(len(ids)),moves]]
+        else: # uniform random opponent
+            legal = states.legal_mask[ids]
+            outcomes[ids] = (outcomes[np.maximum(children,0)]*legal[:,:,None]).sum(axis=1)/legal.sum(axis=1)[:,None]
+    return outcomes[0]
+
+def exact_rates(rlplayer,opponent="random"):
+    ## same layout as the sampled evaluation of the SARSA scripts, in percent:
+    ## (rl wins as first, as second), (opponent wins as first, as second), (draws with rl first, second)
+    x_win_1,draw_1,o_win_1 = (100*match_probabilities(rlplayer,1,opponent)).tolist()
+    x_win_2,draw_2,o_win_2 = (100*match_probabilities(rlplayer,-1,opponent)).tolist()
+    return (x_win_1,o_win_2),(x_win_2,o_win_1),(draw_1,draw_2)
+
+def _evaluation_worker(evaluate,rlplayer,shm_name,n_slots,shape,dtype,tasks,results):
+    ## evaluates the table snapshot in the shared slot of every (epoch, slot) task until a None arrives
+    shm = SharedMemory(name=shm_name)
+    snapshots = np.ndarray((n_slots,*shape),dtype=dtype,buffer=shm.buf)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        epoch,slot = task
+        rlplayer.qtable.values = snapshots[slot]
+        results.put((epoch,slot,evaluate(rlplayer)))
+    del rlplayer,snapshots # drop the views before closing the block
+    shm.close()
+
+class BackgroundEvaluator:
+    ## runs evaluate(rlplayer) on the player as it was at submit() in one long-lived worker process:
+    ## submit() copies the Q-table into one of max_pending shared-memory slots and queues it, and
+    ## only waits when every slot still holds a snapshot the worker has not finished with
+    def __init__(self,evaluate,max_pending=2):
+        self.ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        self.evaluate = evaluate
+        self.max_pending = max_pending
+        self.worker = None
+        self.free = list(range(max_pending)) # slots not waiting for an evaluation
+        self.finished = [] # (epoch, result) not handed out yet
+
+    @property
+    def running(self):
+        return self.max_pending - len(self.free)
+
+    def start(self,rlplayer):
+        ## the worker gets the player once without its table, the tables come through the slots
+        values = rlplayer.qtable.values
+        self.shm = SharedMemory(create=True,size=self.max_pending*values.nbytes)
+        self.snapshots = np.ndarray((self.max_pending,*values.shape),dtype=values.dtype,buffer=self.shm.buf)
+        self.tasks = self.ctx.Queue()
+        self.results = self.ctx.Queue()
+        template = copy.copy(rlplayer)
+        template.qtable = copy.copy(rlplayer.qtable)
+        template.qtable.values = None
+        self.worker = self.ctx.Process(target=_evaluation_worker,daemon=True,
+                                       args=(self.evaluate,template,self.shm.name,self.max_pending,
+                                             values.shape,values.dtype,self.tasks,self.results))
+        self.worker.start()
+
+    def collect(self,block):
+        ## one result into finished, False if none is ready (block=False)
+        while True:
+            try:
+                epoch,slot,result = self.results.get(timeout=1.0) if block else self.results.get_nowait()
+                break
+            except queue.Empty:
+                if not block:
+                    return False
+                if not self.worker.is_alive():
+                    raise RuntimeError(f"evaluation worker exited with code {self.worker.exitcode}")
+        self.free.append(slot)
+        self.finished.append((epoch,result))
+        return True
+
+    def submit(self,epoch,rlplayer):
+        if self.worker is None:
+            self.start(rlplayer)
+        while not self.free: # the worker is max_pending snapshots behind
+            self.collect(block=True)
+        slot = self.free.pop()
+        self.snapshots[slot] = rlplayer.qtable.values
+        self.tasks.put((epoch,slot))
+
+    def poll(self):
+        ## finished (epoch, result) pairs in epoch order, without waiting
+        while self.running > 0 and self.collect(block=False):
+            pass
+        finished,self.finished = sorted(self.finished,key=lambda r: r[0]),[]
+        return finished
+
+    def wait(self):
+        ## every outstanding result, blocking until they are all in
+        while self.running > 0:
+            self.collect(block=True)
+        return self.poll()
+
+    def close(self):
+        finished = self.wait()
+        if self.worker is not None:
+            self.tasks.put(None)
+            self.worker.join()
+            del self.snapshots
+            self.shm.close()
+            self.shm.unlink()
+            self.worker = None
+        return finished
@@ -1,51 +1,105 @@
-import numpy as np
-import torch
-class Game:
-    def __init__(self):
-       self.board = np.zeros((3,3))
-       self.current_player = 1
-
-    def make_move(self,x,y):
-       self.board[x][y] = self.current_player
-       self.current_player*=-1
-    
-    def unmake_move(self,x,y):
-       self.board[x][y] = 0
-       self.current_player*=-1
-   
-    def legal_moves(self):
-       flat = self.board.flatten()
-       return np.where(flat == 0)[0]
-    
-    def game_state(self):
-       board_string = str((self.current_player*self.board.astype(np.int64)).flatten()) ## canonical board states
-       return board_string
-    
-    def game_state_tensor(self):
-       return torch.tensor(self.current_player*self.board.astype(np.float32).flatten())
-    
-    def game_status(self):
-       column_sum = np.sum(self.board,axis = 0) 
-       row_sum = np.sum(self.board,axis = 1)
-       p_diagonal = np.trace(self.board)
-       nonp_diagonal = np.trace(np.fliplr(self.board))
-      
-       if (-3 in column_sum) or (3 in column_sum):
-          return -self.current_player
-       if (-3 in row_sum) or (3 in row_sum):
-          return -self.current_player
-       if (-3 == p_diagonal) or (3 == p_diagonal):
-          return -self.current_player
-       if (-3 == nonp_diagonal) or (3 == nonp_diagonal):
-          return -self.current_player
-       if np.all(self.board != 0):
-          return 0
-       
-       return None # game still going on
-    
-    def display(self):
-       print(f"Player {self.current_player} will make move")
-       print(f"Current game status = {self.game_status()}")
-       print(self.board)
-       print("------------------")
-       print()
\ No newline at end of file
+import numpy as np
+
+## bitboard layout: cell (x,y) is bit 3*x+y, one 9-bit int per player
+FULL_BOARD = 0b111111111
+WIN_LINES = (0b000000111, 0b000111000, 0b111000000, # rows
+             0b001001001, 0b010010010, 0b100100100, # columns
+             0b100010001, 0b001010100)              # diagonals
+
+HAS_LINE = tuple(any(mask & line == line for line in WIN_LINES) for mask in range(512))
+MASK_CELLS = ((np.arange(512)[:,None] >> np.arange(9)) & 1).astype(np.float64) # mask -> 0/1 cells
+TERNARY = tuple(sum(3**(8-i) for i in range(9) if mask >> i & 1) for mask in range(512)) # mask -> base-3 digits
+CELL_WEIGHT = tuple(3**(8-i) for i in range(9))
+STATE_STRINGS = {} # state code -> game_state() string, filled on first use
+
+def _legal_moves(occupied):
+    moves = np.array([i for i in range(9) if not occupied >> i & 1],dtype=np.int64)
+    moves.setflags(write=False) # shared between games, must not be modified
+    return moves
+
+LEGAL_MOVES = tuple(_legal_moves(mask) for mask in range(512))
+
+class Game:
+    def __init__(self):
+       self.bits_x = 0 # cells taken by player 1
+       self.bits_o = 0 # cells taken by player -1
+       self.current_player = 1
+       ## base-3 state keys kept up to date by make_move/unmake_move:
+       ## key_x counts player 1 as 1 and player -1 as 2, key_o the other way round
+       self.key_x = 0
+       self.key_o = 0
+
+    @property
+    def board(self):
+       return (MASK_CELLS[self.bits_x] - MASK_CELLS[self.bits_o]).reshape(3,3)
+
+    @board.setter
+    def board(self,board):
+       flat = np.asarray(board).flatten()
+       self.bits_x = sum(1 << i for i in range(9) if flat[i] == 1)
+       self.bits_o = sum(1 << i for i in range(9) if flat[i] == -1)
+       self.key_x = TERNARY[self.bits_x] + 2*TERNARY[self.bits_o]
+       self.key_o = TERNARY[self.bits_o] + 2*TERNARY[self.bits_x]
+
+    def make_move(self,x,y):
+       weight = CELL_WEIGHT[3*x+y]
+       if self.current_player == 1:
+          self.bits_x |= 1 << (3*x+y)
+          self.key_x += weight
+          self.key_o += 2*weight
+       else:
+          self.bits_o |= 1 << (3*x+y)
+          self.key_x += 2*weight
+          self.key_o += weight
+       self.current_player*=-1
+
+    def unmake_move(self,x,y):
+       bit = 1 << (3*x+y)
+       weight = CELL_WEIGHT[3*x+y]
+       if self.bits_x & bit:
+          self.bits_x &= ~bit
+          self.key_x -= weight
+          self.key_o -= 2*weight
+       elif self.bits_o & bit:
+          self.bits_o &= ~bit
+          self.key_x -= 2*weight
+          self.key_o -= weight
+       self.current_player*=-1
+
+    def legal_moves(self):
+       return LEGAL_MOVES[self.bits_x | self.bits_o]
+
+    def game_state(self):
+       code = self.state_index()
+       board_string = STATE_STRINGS.get(code)
+       if board_string is None:
+          board_string = str((self.current_player*self.board.astype(np.int64)).flatten()) ## canonical board states
+          STATE_STRINGS[code] = board_string
+       return board_string
+
+    def raw_index(self):
+       ## base-3 code of the board itself: 0 empty, 1 player 1, 2 player -1
+       return self.key_x
+
+    def state_index(self):
+       ## base-3 code of game_state(): 0 empty, 1 side to move, 2 opponent, first cell most significant
+       return self.key_x if self.current_player == 1 else self.key_o
+
+    def game_state_tensor(self):
+       import torch # only the network player needs it, and importing it is slow
+       return torch.tensor(self.current_player*self.board.astype(np.float32).flatten())
+
+    def game_status(self):
+       if HAS_LINE[self.bits_x] or HAS_LINE[self.bits_o]:
+          return -self.current_player
+       if self.bits_x | self.bits_o == FULL_BOARD:
+          return 0
+
+       return None # game still going on
+
+    def display(self):
+       print(f"Player {self.current_player} will make move")
+       print(f"Current game status = {self.game_status()}")
+       print(self.board)
+       print("------------------")
+       print()
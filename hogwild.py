@@ -0,0 +1,87 @@
+import os
+import time
+import random
+import numpy as np
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from player import RLPlayer
+from qtable import save_qtable
+from trainer import play_episode
+from evaluate import exact_rates
+
+## Hogwild-style training: several processes play self-play episodes and write their SARSA updates
+## into one Q-table in shared memory without any locking, the parent evaluates the live table
+
+def shared_qtable(symmetric,name=None,compact=False):
+    ## a Q-table whose values live in a SharedMemory block, created when name is None, attached otherwise
+    qtable = RLPlayer(symmetric=symmetric,compact=compact).qtable
+    shm = SharedMemory(name=name,create=name is None,size=qtable.values.nbytes)
+    values = np.ndarray(qtable.values.shape,dtype=qtable.values.dtype,buffer=shm.buf)
+    if name is None:
+        values[:] = 0
+    qtable.values = values
+    return qtable,shm
+
+def worker(shm_name,symmetric,compact,worker_id,episodes,counts,stop,seed,
+           on_policy,alpha,gamma,epsilon,epsilon_decay,min_epsilon):
+    random.seed(seed + worker_id)
+    np.random.seed(seed + worker_id)
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact)
+    rlplayer.qtable,shm = shared_qtable(symmetric,shm_name,compact)
+    for episode in range(1,episodes+1):
+        if stop.is_set():
+            break
+        play_episode(rlplayer,epsilon,alpha,gamma,on_policy)
+        counts[worker_id] = episode
+        epsilon = max(epsilon*epsilon_decay,min_epsilon)
+    del rlplayer # drop the view before closing the block
+    shm.close()
+
+def train_hogwild(n_workers=None,epochs=200000,on_policy=False,symmetric=True,compact=False,alpha=0.1,gamma=0.99,
+                  epsilon=1.0,epsilon_decay=0.9999885,min_epsilon=0.1,seed=0,
+                  target_rate=None,eval_seconds=1.0,verbose=True):
+    ## epochs are split between the workers, each decays epsilon n_workers times faster so the
+    ## schedule per total episode matches the single-process scripts; stops early once the rl player
+    ## wins or draws at least target_rate percent of its games against the random player in both seats
+    n_workers = n_workers or os.cpu_count()
+    qtable,shm = shared_qtable(symmetric,compact=compact)
+    counts = mp.Array('q',n_workers,lock=False)
+    stop = mp.Event()
+    workers = [mp.Process(target=worker,args=(shm.name,symmetric,compact,i,epochs//n_workers,counts,stop,seed,
+                                              on_policy,alpha,gamma,epsilon,epsilon_decay**n_workers,min_epsilon))
+               for i in range(n_workers)]
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact)
+    rlplayer.qtable = qtable
+    history = [] # (seconds, episodes, rl wins as first, rl wins as second)
+
+    start = time.time()
+    try:
+        for p in workers:
+            p.start()
+        running = True
+        while running:
+            time.sleep(eval_seconds)
+            running = any(p.is_alive() for p in workers)
+            wins_rl,_,draws = exact_rates(rlplayer,"random")
+            history.append((time.time() - start,sum(counts),*wins_rl))
+            if verbose:
+                print(f"{history[-1][0]:.1f}s, {history[-1][1]} episodes, rl wins = {wins_rl}")
+            if target_rate is not None and min(w + d for w,d in zip(wins_rl,draws)) >= target_rate:
+                stop.set()
+
+        result = RLPlayer(symmetric=symmetric,compact=compact)
+        result.qtable.values[:] = qtable.values
+    finally:
+        stop.set()
+        for p in workers:
+            if p.pid is not None:
+                p.join()
+        del rlplayer,qtable
+        shm.close()
+        shm.unlink()
+    return result,history
+
+if __name__ == "__main__":
+    rlplayer,history = train_hogwild(target_rate=99)
+    save_qtable(rlplayer.qtable,"q_table_sarsa_hogwild_v1.qtable")
+    print(f"{history[-1][1]} episodes in {history[-1][0]:.1f}s")
@@ -1,15 +1,17 @@
+import os
+import sys
 from player import manual_player, random_player, MMPlayer
 from game import Game
 from player import RLPlayer
-import pickle
+from qtable import load_qtable
 
 Man = MMPlayer()
 theGame = Game()
 player = RLPlayer()
-q_table = "q_table_sarsa_ofpol_v5.pkl"
+q_table = sys.argv[1] if len(sys.argv) > 1 else "q_table_sarsa_ofpol_v5.qtable" # written by offpol_sarsa.py, or e.g. nn_dqn_v1.qtable from dqn.py
+old_q_table = "q_table_sarsa_ofpol_v5.pkl" # the pickled table, until a training run has written the one above
 
-with open(q_table,'rb') as file:
-  player.qtable = pickle.load(file)
+player.qtable = load_qtable(q_table if os.path.exists(q_table) else old_q_table)
 
 print(len(player.qtable))
 x = 1
@@ -0,0 +1,82 @@
+import os
+import sys
+import struct
+import numpy as np
+
+## append-only training metrics: a 16 byte header followed by fixed size records, one per evaluation,
+## so writing an interval costs one record and a reader only parses what was appended since its last read
+METRICS_MAGIC = b"MTRC"
+METRICS_VERSION = 1
+METRICS_HEADER = struct.Struct("<4sHI") # magic, version, record size
+HEADER_SIZE = 16
+METRICS_DTYPE = np.dtype([("epoch","<u8"),
+                          ("wins_rl","<f8",2),       # rl wins as first player, as second player
+                          ("wins_pl","<f8",2),       # opponent wins as first player, as second player
+                          ("draws","<f8",2),         # draws with rl as first player, as second player
+                          ("perfect_draws","<f8",2)]) # draws against perfect play, nan when not measured
+
+class MetricsWriter:
+    def __init__(self,file_name,offset=None):
+        ## a new log, or with offset (from a checkpoint) the existing one cut back to that size
+        if offset is None:
+            self.file = open(file_name,"wb")
+            self.file.write(METRICS_HEADER.pack(METRICS_MAGIC,METRICS_VERSION,METRICS_DTYPE.itemsize).ljust(HEADER_SIZE,b"\0"))
+        else:
+            self.file = open(file_name,"r+b")
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        self.file.flush()
+        self.offset = self.file.tell()
+
+    def write(self,epoch,wins_rl,wins_pl,draws,perfect_draws=(np.nan,np.nan)):
+        record = np.array((epoch,wins_rl,wins_pl,draws,perfect_draws),dtype=METRICS_DTYPE)
+        self.file.write(record.tobytes())
+        self.file.flush() # readers in other processes see whole records
+        self.offset += METRICS_DTYPE.itemsize
+
+    def close(self):
+        self.file.close()
+
+class MetricsReader:
+    def __init__(self,file_name):
+        self.file_name = file_name
+        self.offset = 0
+        self.count = 0
+        self.buffer = np.empty(64,dtype=METRICS_DTYPE)
+
+    @property
+    def records(self): # everything read so far
+        return self.buffer[:self.count]
+
+    def read(self):
+        ## the complete records appended since the last call, a partly written one is left for the next
+        if os.path.getsize(self.file_name) < self.offset: # rewritten, e.g. a run resumed from a checkpoint
+            self.offset,self.count = 0,0
+        with open(self.file_name,"rb") as f:
+            if self.offset == 0:
+                magic,version,size = METRICS_HEADER.unpack(f.read(HEADER_SIZE)[:METRICS_HEADER.size])
+                if magic != METRICS_MAGIC or version > METRICS_VERSION or size != METRICS_DTYPE.itemsize:
+                    raise ValueError(f"{self.file_name} is not a version {METRICS_VERSION} metrics log")
+                self.offset = HEADER_SIZE
+            f.seek(self.offset)
+            data = f.read()
+        n = len(data)//METRICS_DTYPE.itemsize
+        new = np.frombuffer(data,dtype=METRICS_DTYPE,count=n)
+        self.offset += n*METRICS_DTYPE.itemsize
+
+        if self.count + n > len(self.buffer):
+            buffer = np.empty(max(2*len(self.buffer),self.count + n),dtype=METRICS_DTYPE)
+            buffer[:self.count] = self.records
+            self.buffer = buffer
+        self.buffer[self.count:self.count+n] = new
+        self.count += n
+        return new
+
+def read_metrics(file_name):
+    return MetricsReader(file_name).read()
+
+if __name__ == "__main__":
+    ## dump a log as text: python metrics.py metrics_sarsa_ofpol_v5.metrics
+    for r in read_metrics(sys.argv[1]):
+        print(f"{r['epoch']} rl wins = {tuple(r['wins_rl'].tolist())}, pl wins = {tuple(r['wins_pl'].tolist())}, "
+              f"draws = {tuple(r['draws'].tolist())}, draws against perfect play = {tuple(r['perfect_draws'].tolist())}")
@@ -0,0 +1,45 @@
+import numpy as np
+import torch
+import torch.nn as nn
+from game import Game
+from vecgame import VecGame
+from symmetry import DIGITS
+
+## the network player, kept out of player.py so that importing player/game does not load torch
+
+ENCODING = np.array([0,1,-1],dtype=np.float32)[DIGITS] # state code -> network input (Game.game_state_tensor())
+
+def network_values(net,inputs):
+    ## net(inputs) without autograd as a numpy array, host inputs are copied to the network's device
+    inputs = torch.as_tensor(inputs).to(next(net.parameters()).device)
+    with torch.inference_mode():
+        return net(inputs).cpu().numpy()
+
+class NNRLPlayer(nn.Module):
+   def __init__(self):
+    super(NNRLPlayer,self).__init__()
+    self.fc1 = nn.Linear(9,32)
+    self.fc2 = nn.Linear(32,16)
+    self.fc3 = nn.Linear(16,9)
+    self.inputs = torch.empty((0,9)) # reused input rows for move selection, not part of the state dict
+
+   def forward(self,x):
+    x = torch.relu(self.fc1(x))
+    x = torch.relu(self.fc2(x))
+    return self.fc3(x) # action values lie in [-1,1], so no relu on the output
+
+   def move_values(self,codes):
+    ## action values of a batch of state codes, one forward pass without autograd
+    if len(self.inputs) != len(codes):
+      self.inputs = torch.empty((len(codes),9))
+    np.take(ENCODING,codes,axis=0,out=self.inputs.numpy())
+    return network_values(self,self.inputs)
+
+   def best_move(self,game:Game):
+    ## masked argmax over the legal moves, lowest cell on ties like the scalar loops
+    code = game.state_index()
+    values = self.move_values([code])[0]
+    return int(np.where(DIGITS[code] == 0,values,-np.inf).argmax())
+
+   def batch_moves(self,games:VecGame):
+    return games.greedy_actions(self.move_values(games.state_index()))
@@ -1,67 +1,133 @@
 import numpy as np
-import torch.nn as nn
-import torch
-from itertools import product
 from game import Game
+from qtable import QTable
+from symmetry import SymmetricQTable
+from states import CompactQTable
+from solver import solved_game
+from vecgame import VecGame
 import random
 from math import inf
+
+def __getattr__(name): # NNRLPlayer lives in nnplayer.py and loads torch, so only import it when asked for
+    if name == "NNRLPlayer":
+        from nnplayer import NNRLPlayer
+        return NNRLPlayer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 class RLPlayer:
-    def __init__(self):
-        self.p_values = [0,1,-1]
-        p_states = np.array(list(product(self.p_values,repeat=9))).reshape(-1,9)
-        p_board_strings = [str(row) for row in p_states]
-        self.qtable = dict(zip(p_board_strings,[np.zeros(9) for _ in range(pow(3,9))]))
-        self.ntable = dict(zip(p_board_strings,[np.zeros(9,dtype=int) for _ in range(pow(3,9))]))
+    def __init__(self,symmetric=False,compact=False):
+        ## indexed by game_state() or Game.state_index(), symmetric tables share rows between rotations/reflections,
+        ## compact ones only have rows for the reachable positions
+        if symmetric and compact:
+            raise ValueError("a Q-table is either symmetric or compact, not both")
+        if symmetric:
+            self.qtable = SymmetricQTable()
+        else:
+            self.qtable = CompactQTable() if compact else QTable()
     
     def evaluate(self,state):
         return self.qtable[state]
 
-class NNRLPlayer(nn.Module):
-   def __init__(self):
-    super(NNRLPlayer,self).__init__()
-    self.fc1 = nn.Linear(9,32)
-    self.fc2 = nn.Linear(32,16)
-    self.fc3 = nn.Linear(16,9)
+    def batch_moves(self,games:VecGame): # greedy move in every game
+        return games.greedy_actions(self.qtable[games.state_index()])
 
-   def forward(self,x):
-    x = torch.relu(self.fc1(x))
-    x = torch.relu(self.fc2(x))
-    x = torch.relu(self.fc3(x))
-    return x
+## centre, corners, then edges; ORDERED_MOVES[occupied] lists the legal moves in that order
+MOVE_ORDER = (4,0,2,6,8,1,3,5,7)
+ORDERED_MOVES = tuple(tuple(m for m in MOVE_ORDER if not occupied >> m & 1) for occupied in range(512))
+EXACT, LOWER, UPPER = 0, 1, -1
 
 class MMPlayer:
+    table = {} # transposition table shared by every MMPlayer: state_index -> (depth, value, flag, best move)
+
+    def batch_moves(self,games:VecGame): # the move minimax picks, from the solved game
+       return solved_game().best_moves(games.state_index())
+
+    def get_move(self,game:Game,player_id):
+       best = self.minimax(game,9,player_id,player_id)
+       return best[0], best[1]
+
     def minimax(self,game:Game,depth,player,max_player):
-       if player == max_player:
-           best = [-1,-1,-inf]
-       else:
-           best = [-1,-1,+inf]
-    
-       if depth == 0 or game.game_status() is not None: # the game is over
-           if game.game_status() == max_player:
+       status = game.game_status()
+       if depth == 0 or status is not None: # the game is over
+           if status == max_player:
                score = 1
-           elif game.game_status() == -max_player:
+           elif status == -max_player:
                score = -1
            else:
                score = 0 ## draw or game not over
            return [-1,-1,score]
-       
-       legal_moves = game.legal_moves()
-       for move in legal_moves:
+
+       if depth >= len(game.legal_moves()): ## full-depth search, look the answer up in the solved game
+           solved = solved_game()
+           code = game.state_index()
+           best_move, value = solved.best_move(code), solved.value(code)
+           score = value if player == max_player else -value
+           return [best_move//3,best_move%3,score]
+
+       ## depth-limited search: alpha-beta at the root, value 1 is the best there is so stop once it is reached
+       best_move, alpha = -1, -inf
+       for move in self.ordered_moves(game):
            game.make_move(move//3,move%3)
-           score = self.minimax(game,depth-1,-player,max_player)
+           value = -self.search(game,depth-1,-1,-alpha)
            game.unmake_move(move//3,move%3)
-           score[0] = move // 3
-           score[1] = move % 3 
-           
-           if player == max_player:
-               if score[2] > best[2]:
-                   best = score
-           else:
-               if score[2] < best[2]:
-                   best = score
-               
+           if value > alpha:
+               best_move, alpha = move, value
+               if alpha >= 1:
+                   break
+
+       score = alpha if player == max_player else -alpha
+       return [best_move//3,best_move%3,score]
+
+    def search(self,game:Game,depth,alpha,beta):
+       ## negamax value for the side to move, exact inside (alpha, beta) and a bound outside it
+       status = game.game_status()
+       if status is not None:
+           return 0 if status == 0 else -1 # a line on the board belongs to the player who just moved
+       depth = min(depth,len(game.legal_moves()))
+       if depth == 0:
+           return 0
+
+       key = game.state_index()
+       entry = self.table.get(key)
+       if entry is not None and entry[0] == depth:
+           value, flag = entry[1], entry[2]
+           if flag == EXACT:
+               return value
+           if flag == LOWER and value >= beta:
+               return value
+           if flag == UPPER and value <= alpha:
+               return value
+
+       alpha_start = alpha
+       best, best_move = -inf, -1
+       for move in self.ordered_moves(game,entry[3] if entry is not None else -1):
+           game.make_move(move//3,move%3)
+           value = -self.search(game,depth-1,-beta,-alpha)
+           game.unmake_move(move//3,move%3)
+           if value > best:
+               best, best_move = value, move
+               if best > alpha:
+                   alpha = best
+                   if alpha >= beta:
+                       break
+
+       if best <= alpha_start:
+           flag = UPPER
+       elif best >= beta:
+           flag = LOWER
+       else:
+           flag = EXACT
+       self.table[key] = (depth,best,flag,best_move)
        return best
 
+    def ordered_moves(self,game:Game,first=-1):
+       moves = ORDERED_MOVES[game.bits_x | game.bits_o]
+       if first == -1:
+           entry = self.table.get(game.state_index())
+           first = entry[3] if entry is not None else -1
+       if first != -1 and first != moves[0]:
+           return (first,) + tuple(m for m in moves if m != first)
+       return moves
+
 class manual_player:
     def manual_move(self,game:Game):
        a, b = map(int, input("Enter two numbers separated by a comma: ").split(','))
@@ -72,7 +138,41 @@ class random_player:
       move = random.choice(game.legal_moves())
       game.make_move(move//3,move%3)
 
+   def batch_moves(self,games:VecGame):
+      return games.random_actions()
+
 class match_maker:
+    def play_matches(self,n_games,first_player,second_player):
+        ## n_games games at once between two players with batch_moves, returns
+        ## (player 1 wins, draws, player -1 wins) counts
+        games = VecGame(n_games)
+        running = np.ones(n_games,dtype=bool)
+        results = np.zeros(n_games,dtype=np.int8)
+        mover = first_player
+        while running.any():
+            actions = mover.batch_moves(games)
+            games.make_moves(actions[running],games.index[running])
+            done,winner = games.game_status()
+            results[running & done] = winner[running & done]
+            running &= ~done
+            mover = second_player if mover is first_player else first_player
+        return int(np.sum(results == 1)),int(np.sum(results == 0)),int(np.sum(results == -1))
+
+    def create_perfect_matches(self,max_player:int,rlPlayer:RLPlayer,n_games):
+        if max_player == 1:
+            return self.play_matches(n_games,MMPlayer(),rlPlayer)
+        return self.play_matches(n_games,rlPlayer,MMPlayer())
+
+    def create_random_matches(self,rand_player:int,rlPlayer:RLPlayer,n_games):
+        if rand_player == 1:
+            return self.play_matches(n_games,random_player(),rlPlayer)
+        return self.play_matches(n_games,rlPlayer,random_player())
+
+    def create_nn_matches(self,rand_player:int,rlplayer:"NNRLPlayer",n_games):
+        if rand_player == 1:
+            return self.play_matches(n_games,random_player(),rlplayer)
+        return self.play_matches(n_games,rlplayer,random_player())
+
     def create_perfect_match(self,max_player:int,rlPlayer:RLPlayer): # max_player is the perfect player
         game = Game()
         perfectPlayer = MMPlayer()
@@ -82,9 +182,10 @@ class match_maker:
          legal_moves = game.legal_moves()
 
          if game.current_player != max_player: 
+           all_actions = rlPlayer.qtable[game.state_index()]
            optimal_move = legal_moves[0]
            for move in legal_moves:
-               if rlPlayer.qtable[game.game_state()][move] > rlPlayer.qtable[game.game_state()][optimal_move]:
+               if all_actions[move] > all_actions[optimal_move]:
                    optimal_move = move
            game.make_move(optimal_move//3,optimal_move%3)
 
@@ -104,9 +205,10 @@ class match_maker:
          legal_moves = game.legal_moves()
 
          if game.current_player != rand_player: 
+           all_actions = rlPlayer.qtable[game.state_index()]
            optimal_move = legal_moves[0]
            for move in legal_moves:
-               if rlPlayer.qtable[game.game_state()][move] > rlPlayer.qtable[game.game_state()][optimal_move]:
+               if all_actions[move] > all_actions[optimal_move]:
                    optimal_move = move
            game.make_move(optimal_move//3,optimal_move%3)
 
@@ -116,7 +218,7 @@ class match_maker:
         #game.display()
         return game.game_status()
     
-    def create_nn_match(self,rand_player:int, rlplayer: NNRLPlayer):
+    def create_nn_match(self,rand_player:int, rlplayer: "NNRLPlayer"):
         game = Game()
         randomPlayer = random_player()
         # first move is manual player
@@ -125,10 +227,7 @@ class match_maker:
          legal_moves = game.legal_moves()
 
          if game.current_player != rand_player: 
-           optimal_move = legal_moves[0]
-           for move in legal_moves:
-               if rlplayer(game.game_state_tensor())[move] > rlplayer(game.game_state_tensor())[optimal_move]:
-                   optimal_move = move
+           optimal_move = rlplayer.best_move(game)
            game.make_move(optimal_move//3,optimal_move%3)
 
          else:
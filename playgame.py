@@ -1,10 +1,10 @@
 import pygame
+import os
 import sys
-import pickle
 import numpy as np
-from math import inf
 from game import Game
-from player import RLPlayer
+from player import RLPlayer, MMPlayer
+from qtable import load_qtable
 
 # --- Configuration & Palette ---
 GAME_BOARD_SIZE = 540
@@ -22,7 +22,8 @@ HEATMAP_GRID = HEATMAP_SIZE // 3
 
 LINE_WIDTH = 8
 SYMBOL_WIDTH = 12
-Q_TABLE_FILE = "q_table_sarsa_ofpol_v5.pkl"
+Q_TABLE_FILE = sys.argv[1] if len(sys.argv) > 1 else "q_table_sarsa_ofpol_v5.qtable" # written by offpol_sarsa.py, or e.g. nn_dqn_v1.qtable from dqn.py
+OLD_Q_TABLE_FILE = "q_table_sarsa_ofpol_v5.pkl" # the pickled table, until a training run has written the one above
 
 # --- DARK MODE PALETTE ---
 BG_COLOR = (30, 30, 35)          
@@ -45,38 +46,6 @@ BTN_TOGGLE_OFF = (100, 100, 110)
 BTN_EXECUTE = (0, 122, 204)      
 BTN_TEXT = (255, 255, 255)
 
-# --- MINIMAX CLASS ---
-class MMPlayer:
-    def __init__(self): pass
-
-    def get_move(self, game, player_id):
-        result = self.minimax(game, 9, player_id, player_id)
-        return result[0], result[1] 
-
-    def minimax(self, game, depth, player, max_player):
-        if player == max_player: best = [-1, -1, -inf]
-        else: best = [-1, -1, +inf]
-    
-        if depth == 0 or game.game_status() is not None: 
-            if game.game_status() == max_player: score = 1
-            elif game.game_status() == -max_player: score = -1
-            else: score = 0 
-            return [-1, -1, score]
-        
-        legal_moves = game.legal_moves()
-        for move in legal_moves:
-            game.make_move(move // 3, move % 3)
-            score = self.minimax(game, depth - 1, -player, max_player)
-            game.unmake_move(move // 3, move % 3)
-            
-            score[0], score[1] = move // 3, move % 3 
-            
-            if player == max_player:
-                if score[2] > best[2]: best = score
-            else:
-                if score[2] < best[2]: best = score
-        return best 
-
 # --- GUI Class ---
 class TicTacToeGUI:
     def __init__(self):
@@ -123,8 +92,7 @@ class TicTacToeGUI:
 
     def load_q_table(self):
         try:
-            with open(Q_TABLE_FILE, "rb") as f:
-                self.rl_agent.qtable = pickle.load(f)
+            self.rl_agent.qtable = load_qtable(Q_TABLE_FILE if os.path.exists(Q_TABLE_FILE) else OLD_Q_TABLE_FILE)
             print(f"Loaded {len(self.rl_agent.qtable)} states.")
         except FileNotFoundError:
             self.rl_agent.qtable = {}
@@ -190,7 +158,7 @@ class TicTacToeGUI:
                 display_actions = {} 
 
         # --- COMPATIBILITY FIX ---
-        if isinstance(display_actions, (list, np.ndarray)):
+        if not isinstance(display_actions, dict):
             display_actions = {i: float(val) for i, val in enumerate(display_actions)}
 
         # --- 2. PREPARE SCALING ---
@@ -0,0 +1,115 @@
+import os
+import sys
+import struct
+import numpy as np
+import pickle
+
+N_STATES = pow(3,9)
+
+## binary checkpoint: a 64 byte header followed by the (rows,9) values in C order, so a file can be
+## mapped straight into a read-only numpy array that several processes share through the page cache
+QTABLE_MAGIC = b"QTBL"
+QTABLE_VERSION = 2 # highest version read; plain and symmetric tables are still written as version 1
+QTABLE_HEADER = struct.Struct("<4sHB9sIH") # magic, version, kind, dtype, rows, columns
+HEADER_SIZE = 64
+PLAIN, SYMMETRIC, COMPACT = 0, 1, 2
+
+def state_code(state):
+    ## base-3 code of a game_state() string, same order as product([0,1,-1],repeat=9)
+    code = 0
+    for v in state.strip('[]').split():
+        code = 3*code + int(v) % 3
+    return code
+
+class QTable:
+    kind = PLAIN # table layout recorded in binary checkpoints
+
+    def __init__(self,n_states=N_STATES,dtype=np.float64):
+        self.values = np.zeros((n_states,9),dtype=dtype) # one contiguous row per state code
+
+    @classmethod
+    def from_dict(cls,table): # old pickled {game_state(): ndarray} tables
+        qtable = cls()
+        for state,actions in table.items():
+            qtable[state] = actions
+        return qtable
+
+    def codes(self,key):
+        if isinstance(key,str):
+            return state_code(key)
+        if isinstance(key,(list,tuple)) and key and isinstance(key[0],str):
+            return np.array([state_code(k) for k in key])
+        return key # state code or array of state codes
+
+    def rows(self,key):
+        return self.codes(key)
+
+    def __getitem__(self,key):
+        return self.values[self.rows(key)] # a view for a single state, a copy for a batch
+
+    def __setitem__(self,key,actions):
+        self.values[self.rows(key)] = actions
+
+    def __contains__(self,key):
+        return 0 <= self.codes(key) < N_STATES
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self,keys,actions): # batched read of single entries
+        return self.values[self.rows(keys),actions]
+
+    def add(self,keys,actions,deltas): # batched write, repeated (state,action) pairs accumulate
+        np.add.at(self.values,(self.rows(keys),actions),deltas)
+
+    def entries(self,keys,actions): # flat positions in values
+        return self.rows(keys)*9 + actions
+
+    def update(self,keys,actions,targets,alpha):
+        ## batched Q(s,a) += alpha*(target - Q(s,a)): a pair repeated k times in the batch moves
+        ## towards its mean target as far as k updates in a row would
+        entries,inverse,counts = np.unique(self.entries(keys,actions),return_inverse=True,return_counts=True)
+        mean_targets = np.bincount(inverse,weights=targets,minlength=len(entries))/counts
+        flat = self.values.reshape(-1)
+        flat[entries] += (1 - (1-alpha)**counts)*(mean_targets - flat[entries])
+
+def _table_class(kind):
+    from symmetry import SymmetricQTable # symmetry.py and states.py build on this module
+    from states import CompactQTable
+    return {PLAIN: QTable,SYMMETRIC: SymmetricQTable,COMPACT: CompactQTable}[kind]
+
+def save_qtable(qtable,file_name,dtype=None):
+    ## write the binary format through a temporary file and a rename, dtype e.g. np.float16 to shrink it
+    values = qtable.values if dtype is None else qtable.values.astype(dtype)
+    version = 2 if qtable.kind == COMPACT else 1 # version 1 readers can still load the other kinds
+    header = QTABLE_HEADER.pack(QTABLE_MAGIC,version,qtable.kind,values.dtype.str.encode(),*values.shape)
+    tmp_name = f"{file_name}.{os.getpid()}.tmp"
+    with open(tmp_name,"wb") as f:
+        f.write(header.ljust(HEADER_SIZE,b"\0"))
+        f.write(np.ascontiguousarray(values).tobytes())
+    os.replace(tmp_name,file_name)
+
+def load_qtable(file_name,mmap=True):
+    ## binary checkpoints are memory-mapped read-only unless mmap is False (a writable float64 copy),
+    ## pickled QTable objects and old pickled dicts are still read
+    with open(file_name,"rb") as f:
+        header = f.read(HEADER_SIZE)
+        if not header.startswith(QTABLE_MAGIC):
+            f.seek(0)
+            qtable = pickle.load(f)
+            return QTable.from_dict(qtable) if isinstance(qtable,dict) else qtable
+
+    _,version,kind,dtype,rows,columns = QTABLE_HEADER.unpack(header[:QTABLE_HEADER.size])
+    if version > QTABLE_VERSION:
+        raise ValueError(f"{file_name} is a version {version} Q-table, this code reads up to {QTABLE_VERSION}")
+    values = np.memmap(file_name,dtype=np.dtype(dtype.rstrip(b"\0").decode()),mode="r",
+                       offset=HEADER_SIZE,shape=(rows,columns))
+    qtable = object.__new__(_table_class(kind)) # no zero table to throw away
+    qtable.values = values if mmap else np.array(values,dtype=np.float64)
+    return qtable
+
+if __name__ == "__main__":
+    ## convert pickled tables: python qtable.py q_table.pkl q_table.qtable [float16]
+    dtype = sys.argv[3] if len(sys.argv) > 3 else None
+    save_qtable(load_qtable(sys.argv[1]),sys.argv[2],dtype)
+    print(f"Wrote {sys.argv[2]}")
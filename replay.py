@@ -0,0 +1,137 @@
+import numpy as np
+
+## experience replay: transitions live in preallocated arrays used as a ring buffer, sampling and the
+## updates built on it work on whole minibatches
+
+class ReplayBuffer:
+    def __init__(self,capacity=10000,rng=None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.states = np.zeros(capacity,dtype=np.int64)
+        self.actions = np.zeros(capacity,dtype=np.int8)
+        self.rewards = np.zeros(capacity,dtype=np.float64)
+        self.next_states = np.zeros(capacity,dtype=np.int64)
+        self.dones = np.zeros(capacity,dtype=bool)
+        self.next_legal = np.zeros((capacity,9),dtype=bool) # legal moves of the next state, none when done
+        self.position = 0 # next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self,states,actions,rewards,next_states,dones,next_legal):
+        ## one transition or a batch of them (next_legal (9,) or (n,9)), the oldest are overwritten
+        n = np.size(states)
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = dones
+        self.next_legal[slots] = next_legal
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n,self.capacity)
+        return slots
+
+    def batch(self,slots):
+        return (self.states[slots],self.actions[slots],self.rewards[slots],
+                self.next_states[slots],self.dones[slots],self.next_legal[slots])
+
+    def sample(self,batch_size):
+        ## uniform minibatch with replacement:
+        ## (slots, states, actions, rewards, next_states, dones, next_legal, importance weights)
+        slots = self.rng.integers(0,self.size,batch_size)
+        return (slots,*self.batch(slots),np.ones(batch_size))
+
+    def update_priorities(self,slots,errors):
+        pass
+
+class SumTree:
+    ## priorities in the leaves of a binary tree stored as an array (root at 1, children of i at 2i, 2i+1),
+    ## every node holds the sum of its children; updates and lookups walk one path for a whole batch
+    def __init__(self,capacity):
+        self.leaves = 1 << max(capacity - 1,1).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2*self.leaves)
+
+    def total(self):
+        return self.tree[1]
+
+    def __getitem__(self,slots):
+        return self.tree[self.leaves + slots]
+
+    def update(self,slots,priorities):
+        tree = self.tree
+        slots = np.ravel(slots)
+        if len(slots) <= 16: # a few slots: walk each path with plain ints, cheaper than numpy on tiny arrays
+            for slot,priority in zip(slots.tolist(),np.broadcast_to(priorities,slots.shape).tolist()):
+                node = self.leaves + slot
+                tree[node] = priority
+                while node > 1:
+                    node //= 2
+                    tree[node] = tree[2*node] + tree[2*node + 1]
+            return
+        nodes = self.leaves + slots
+        tree[nodes] = priorities
+        for _ in range(self.depth): # shared parents are written more than once, always with the same sum
+            nodes = nodes // 2
+            tree[nodes] = tree[2*nodes] + tree[2*nodes + 1]
+
+    def find(self,values):
+        ## the slot whose prefix sum range contains each value in [0, total)
+        nodes = np.ones(len(values),dtype=np.int64)
+        values = np.array(values,dtype=np.float64)
+        for _ in range(self.depth):
+            left = 2*nodes
+            right = values >= self.tree[left]
+            values -= np.where(right,self.tree[left],0.0)
+            nodes = left + right
+        return nodes - self.leaves
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    ## samples transitions in proportion to (|TD error| + min_priority)**priority_exponent, new ones at the
+    ## highest priority so far; importance weights (N*P)**-beta, scaled to at most 1, undo the bias as
+    ## beta anneals to 1 by beta_increment per minibatch
+    def __init__(self,capacity=10000,rng=None,priority_exponent=0.6,beta=0.4,beta_increment=1e-5,min_priority=1e-3):
+        super().__init__(capacity,rng)
+        self.tree = SumTree(capacity)
+        self.priority_exponent = priority_exponent
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.min_priority = min_priority
+        self.max_priority = 1.0
+
+    def add(self,states,actions,rewards,next_states,dones,next_legal):
+        slots = super().add(states,actions,rewards,next_states,dones,next_legal)
+        self.tree.update(slots,self.max_priority)
+        return slots
+
+    def sample(self,batch_size):
+        ## one value from each of batch_size equal slices of the total priority
+        total = self.tree.total()
+        values = (np.arange(batch_size) + self.rng.random(batch_size))*(total/batch_size)
+        slots = np.minimum(self.tree.find(np.minimum(values,np.nextafter(total,0))),self.size - 1)
+        weights = (self.size*self.tree[slots]/total)**-self.beta
+        self.beta = min(self.beta + self.beta_increment,1.0)
+        return (slots,*self.batch(slots),weights/weights.max())
+
+    def update_priorities(self,slots,errors):
+        priorities = (np.abs(errors) + self.min_priority)**self.priority_exponent
+        self.tree.update(slots,priorities)
+        self.max_priority = max(self.max_priority,priorities.max())
+
+def td_targets(rewards,next_values,dones,next_legal,gamma):
+    ## reward - gamma*max over the legal next actions, next_values (n,9) from the side to move next
+    ## (a Q-table or a network), the plain reward for terminal transitions
+    best_next = np.where(next_legal,next_values,-np.inf).max(axis=1)
+    return rewards - gamma*np.where(dones,0.0,best_next)
+
+def replay_update(qtable,buffer,batch_size,alpha,gamma):
+    ## one batched Q-table update from a minibatch, an importance weight w scales the step to alpha*w
+    slots,states,actions,rewards,next_states,dones,next_legal,weights = buffer.sample(batch_size)
+    targets = td_targets(rewards,qtable[next_states],dones,next_legal,gamma)
+    values = qtable.get(states,actions)
+    errors = targets - values
+    qtable.update(states,actions,values + weights*errors,alpha)
+    buffer.update_priorities(slots,errors)
+    return slots,errors
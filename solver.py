@@ -0,0 +1,115 @@
+import os
+import numpy as np
+from qtable import N_STATES
+from symmetry import DIGITS, POW3
+from game import WIN_LINES
+
+## solved game: for every state code (side to move as 1, see Game.state_index) its game-theoretic
+## value for the side to move and the bitmask of optimal moves, unreachable codes are all zero
+SOLVED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"solved_table.npy")
+SOLVED_DTYPE = np.dtype([('value','i1'),('moves','u2'),('reachable','?')])
+
+SWAP = ((3 - DIGITS) % 3) @ POW3 # state code seen by the other player
+LINES = np.array([[line >> i & 1 for i in range(9)] for line in WIN_LINES],dtype=bool)
+
+def _children(codes):
+    ## (n,9) codes after the side to move plays each cell, -1 where the cell is taken
+    empty = DIGITS[codes] == 0
+    children = SWAP[codes[:,None] + POW3[None,:]*empty]
+    return np.where(empty,children,-1)
+
+OPPONENT_LINE = ((DIGITS == 2).astype(int) @ LINES.T.astype(int) == 3).any(axis=1) # the last mover has won
+TERMINAL = OPPONENT_LINE | (DIGITS != 0).all(axis=1)
+
+def reachable_plies():
+    ## forward pass: the sorted codes of the positions reachable after 0..9 moves
+    plies = [np.array([0])]
+    for _ in range(9):
+        codes = plies[-1][~TERMINAL[plies[-1]]]
+        children = _children(codes)
+        plies.append(np.unique(children[children >= 0]))
+    return plies
+
+def solve():
+    plies = reachable_plies()
+    table = np.zeros(N_STATES,dtype=SOLVED_DTYPE)
+    value = np.zeros(N_STATES,dtype=np.int8)
+    value[OPPONENT_LINE] = -1
+
+    ## backward pass: a position is worth the best negated value of its children
+    for codes in reversed(plies):
+        table['reachable'][codes] = True
+        codes = codes[~TERMINAL[codes]]
+        if len(codes) == 0:
+            continue
+        children = _children(codes)
+        scores = np.where(children >= 0,-value[np.maximum(children,0)],-2)
+        best = scores.max(axis=1)
+        value[codes] = best
+        table['moves'][codes] = ((scores == best[:,None]) << np.arange(9)).sum(axis=1)
+
+    table['value'] = value * table['reachable']
+    return table
+
+def write_table(table,file_name):
+    tmp_name = file_name + ".tmp"
+    with open(tmp_name,"wb") as f:
+        np.save(f,table)
+    os.replace(tmp_name,file_name)
+    return table
+
+def load_table(file_name,build):
+    ## the table saved in file_name memory-mapped, built and saved first when the file is missing
+    if os.path.exists(file_name):
+        return np.load(file_name,mmap_mode='r')
+    table = build()
+    try:
+        write_table(table,file_name)
+    except OSError:
+        pass # read-only checkout, keep it in memory
+    return table
+
+def write_solved(file_name=SOLVED_FILE):
+    return write_table(solve(),file_name)
+
+class SolvedGame:
+    def __init__(self,file_name=SOLVED_FILE):
+        self.table = load_table(file_name,solve)
+        self.values = self.table['value']
+        self.moves = self.table['moves']
+        self.reachable = self.table['reachable']
+
+    def value(self,code):
+        return int(self.values[code])
+
+    def optimal_moves(self,code):
+        moves = int(self.moves[code])
+        return [m for m in range(9) if moves >> m & 1]
+
+    def best_move(self,code): # lowest optimal cell, the move the plain minimax picked
+        moves = int(self.moves[code])
+        return (moves & -moves).bit_length() - 1
+
+    def best_moves(self,codes): # best_move of every code in an array
+        return np.argmax((self.moves[codes][:,None] >> np.arange(9)) & 1,axis=1)
+
+    def is_optimal(self,code,move):
+        return bool(self.moves[code] >> move & 1)
+
+    def policy_accuracy(self,qtable):
+        ## fraction of reachable non-terminal positions where the greedy action of qtable is optimal
+        codes = np.flatnonzero(self.reachable & (self.moves != 0))
+        actions = np.where(DIGITS[codes] == 0,qtable[codes],-np.inf).argmax(axis=1)
+        return float(np.mean(self.moves[codes] >> actions & 1))
+
+_solved = None
+
+def solved_game():
+    global _solved
+    if _solved is None:
+        _solved = SolvedGame()
+    return _solved
+
+if __name__ == "__main__":
+    table = write_solved()
+    print(f"Solved {int(table['reachable'].sum())} positions, value of the empty board = {table['value'][0]}")
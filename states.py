@@ -0,0 +1,90 @@
+import os
+import numpy as np
+from qtable import QTable, N_STATES, COMPACT
+from symmetry import DIGITS
+from solver import OPPONENT_LINE, TERMINAL, _children, reachable_plies, write_table, load_table
+
+## reachable-state index: every position that can occur in a game gets a compact id, ordered by ply so
+## children always have larger ids than their parents, with its legal moves, result and children
+STATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"state_index.npy")
+STATES_DTYPE = np.dtype([('code','<u2'),       # Game.state_index() of the position
+                         ('ply','u1'),         # moves played so far
+                         ('legal','<u2'),      # bit i set if cell i can be played, 0 once the game is over
+                         ('terminal','?'),
+                         ('winner','i1'),      # 1/-1 when that player has won, else 0
+                         ('children','<i2',9)]) # id after playing each cell, -1 where it cannot be played
+
+def enumerate_states():
+    plies = reachable_plies() # the positions solver.solve() marks reachable
+    codes = np.concatenate(plies)
+    id_of = np.full(N_STATES,-1,dtype=np.int64)
+    id_of[codes] = np.arange(len(codes))
+    table = np.zeros(len(codes),dtype=STATES_DTYPE)
+    table['code'] = codes
+    table['ply'] = np.repeat(np.arange(len(plies)),[len(p) for p in plies])
+    table['terminal'] = TERMINAL[codes]
+    player = np.where(table['ply'] % 2 == 0,1,-1) # side to move
+    table['winner'] = np.where(OPPONENT_LINE[codes],-player,0)
+    playable = (DIGITS[codes] == 0) & ~table['terminal'][:,None]
+    table['legal'] = (playable << np.arange(9)).sum(axis=1)
+    children = _children(codes)
+    table['children'] = np.where(playable,id_of[np.maximum(children,0)],-1)
+    return table
+
+def write_states(file_name=STATES_FILE):
+    return write_table(enumerate_states(),file_name)
+
+class StateIndex:
+    def __init__(self,file_name=STATES_FILE):
+        self.table = load_table(file_name,enumerate_states)
+        self.codes = self.table['code']
+        self.ply = self.table['ply']
+        self.legal = self.table['legal']
+        self.terminal = self.table['terminal']
+        self.winner = self.table['winner']
+        self.children = self.table['children']
+        self.player = np.where(self.ply % 2 == 0,1,-1).astype(np.int8)
+        self.legal_mask = (self.legal[:,None] >> np.arange(9) & 1).astype(bool)
+        self.id_of = np.full(N_STATES,-1,dtype=np.int64) # state code -> id, -1 if unreachable
+        self.id_of[self.codes] = np.arange(len(self.codes))
+        self.ply_start = np.searchsorted(self.ply,np.arange(11)) # ids of ply p: ply_start[p]:ply_start[p+1]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ids(self,codes):
+        return self.id_of[codes]
+
+_states = None
+
+def reachable_states():
+    global _states
+    if _states is None:
+        _states = StateIndex()
+    return _states
+
+class CompactQTable(QTable):
+    ## one row per reachable position instead of per base-3 code, indexed by state code as before;
+    ## unreachable codes have no row and raise a KeyError
+    kind = COMPACT
+
+    def __init__(self,dtype=np.float64):
+        self.values = np.zeros((len(reachable_states()),9),dtype=dtype)
+
+    def rows(self,key):
+        codes = self.codes(key)
+        ids = reachable_states().id_of[codes]
+        if np.ndim(ids) == 0: # single states are looked up once per move, keep them off np.any
+            if ids < 0:
+                raise KeyError(f"unreachable state code {codes}")
+        elif (ids < 0).any():
+            raise KeyError(f"unreachable state code {np.asarray(codes)[ids < 0].flat[0]}")
+        return ids
+
+    def __contains__(self,key):
+        code = self.codes(key)
+        return 0 <= code < N_STATES and reachable_states().id_of[code] >= 0
+
+if __name__ == "__main__":
+    table = write_states()
+    print(f"Indexed {len(table)} reachable positions, {int(table['terminal'].sum())} of them final")
@@ -0,0 +1,44 @@
+import os
+import csv
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from trainer import train
+
+## hyperparameter sweep over the SARSA trainer: every (config, seed) pair is one train() call in its own
+## process and output directory, the final metrics of all runs end up in one results table
+
+def grid(**params):
+    ## every combination of the given value lists, e.g. grid(alpha=[0.1,0.2],on_policy=[False,True])
+    names = list(params)
+    return [dict(zip(names,values)) for values in product(*params.values())]
+
+def run_name(config):
+    return "_".join(f"{k}={v}" for k,v in sorted(config.items()))
+
+def run_config(job):
+    sweep_dir,config = job
+    out_dir = os.path.join(sweep_dir,run_name(config))
+    ## the pool already keeps every core busy, so evaluations run inline unless a config asks otherwise
+    metrics = train(out_dir=out_dir,verbose=False,**{"background_eval": False,**config})
+    return {**config,**metrics,"out_dir": out_dir}
+
+def sweep(configs,seeds=(0,),sweep_dir="sweep",processes=None,results_file="results.csv"):
+    jobs = [(sweep_dir,{**config,"seed": seed}) for config in configs for seed in seeds]
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        results = []
+        for result in pool.map(run_config,jobs):
+            results.append(result)
+            print(f"{len(results)}/{len(jobs)} {run_name({k: result[k] for k in jobs[0][1]})}: "
+                  f"rl wins = {result['wins_rl']}, policy accuracy = {result['policy_accuracy']:.3f}")
+
+    os.makedirs(sweep_dir,exist_ok=True)
+    with open(os.path.join(sweep_dir,results_file),"w",newline="") as f:
+        writer = csv.DictWriter(f,fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+    return results
+
+if __name__ == "__main__":
+    configs = grid(on_policy=[False,True],alpha=[0.05,0.1,0.2],epsilon_decay=[0.9999885,0.99997],
+                   epochs=[50000],plot=[False])
+    sweep(configs,seeds=(0,1))
@@ -0,0 +1,87 @@
+import numpy as np
+from qtable import QTable, N_STATES, SYMMETRIC
+
+## the 8 symmetries of the board (4 rotations, each optionally mirrored) as cell permutations:
+## the transformed board is board[PERMS[s]], and action a becomes action TO_CANON[s][a]
+_cells = np.arange(9).reshape(3,3)
+PERMS = np.array([np.rot90(np.fliplr(_cells) if s >= 4 else _cells,s % 4).flatten() for s in range(8)])
+TO_CANON = np.argsort(PERMS,axis=1)
+FROM_CANON = PERMS
+
+POW3 = 3**np.arange(8,-1,-1)
+DIGITS = (np.arange(N_STATES)[:,None] // POW3) % 3 # state code -> base-3 cells
+
+def _canonicalise():
+    sym_codes = np.stack([DIGITS[:,perm] @ POW3 for perm in PERMS],axis=1)
+    sym = np.argmin(sym_codes,axis=1) # first symmetry reaching the smallest code
+    canonical = sym_codes[np.arange(N_STATES),sym]
+    classes,class_id = np.unique(canonical,return_inverse=True)
+    return canonical,sym,class_id,len(classes)
+
+CANONICAL,SYMMETRY,CLASS_ID,N_CLASSES = _canonicalise()
+
+def canonical_state(code):
+    return CANONICAL[code],SYMMETRY[code]
+
+def to_canonical(code,action):
+    return TO_CANON[SYMMETRY[code],action]
+
+def from_canonical(code,action):
+    return FROM_CANON[SYMMETRY[code],action]
+
+class SymmetricRow:
+    ## the actions of one state seen through its symmetry, writes go to the shared canonical row
+    def __init__(self,row,perm):
+        self.row = row
+        self.perm = perm
+
+    def __getitem__(self,action):
+        return self.row[self.perm[action]]
+
+    def __setitem__(self,action,value):
+        self.row[self.perm[action]] = value
+
+    def __array__(self,dtype=None,copy=None):
+        return np.asarray(self.row[self.perm],dtype=dtype)
+
+    def __iter__(self):
+        return iter(self.row[self.perm])
+
+    def __len__(self):
+        return 9
+
+class SymmetricQTable(QTable):
+    ## one row per symmetry class of states, roughly 1/8 of the plain table
+    kind = SYMMETRIC
+
+    def __init__(self,dtype=np.float64):
+        self.values = np.zeros((N_CLASSES,9),dtype=dtype)
+
+    def rows(self,key):
+        return CLASS_ID[self.codes(key)]
+
+    def __getitem__(self,key):
+        code = self.codes(key)
+        if np.ndim(code) == 0:
+            row = self.values[CLASS_ID[code]]
+            return row if SYMMETRY[code] == 0 else SymmetricRow(row,TO_CANON[SYMMETRY[code]])
+        return np.take_along_axis(self.values[CLASS_ID[code]],TO_CANON[SYMMETRY[code]],axis=1)
+
+    def __setitem__(self,key,actions):
+        code = self.codes(key)
+        if np.ndim(code) == 0:
+            self.values[CLASS_ID[code],TO_CANON[SYMMETRY[code]]] = actions
+        else:
+            self.values[CLASS_ID[code][:,None],TO_CANON[SYMMETRY[code]]] = actions
+
+    def get(self,keys,actions):
+        code = self.codes(keys)
+        return self.values[CLASS_ID[code],TO_CANON[SYMMETRY[code],actions]]
+
+    def add(self,keys,actions,deltas):
+        code = self.codes(keys)
+        np.add.at(self.values,(CLASS_ID[code],TO_CANON[SYMMETRY[code],actions]),deltas)
+
+    def entries(self,keys,actions):
+        code = self.codes(keys)
+        return CLASS_ID[code]*9 + TO_CANON[SYMMETRY[code],actions]
@@ -1,36 +1,128 @@
+import os
 import ast
-import matplotlib 
+import queue
+import multiprocessing as mp
+import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+from metrics import MetricsReader
 
 class logger:
+ def __init__(self):
+  self.readers = {} # one incremental reader per metrics log, each plot only parses the new records
+  self.figures = {} # one figure per kind of plot, redrawn with new line data instead of a new figure
+
+ def figure(self,kind):
+  if kind not in self.figures:
+   fig = plt.figure(figsize=(16,9))
+   ax = fig.gca()
+   if kind == "avg_plot":
+    lines = [ax.plot([],[],color='blue',linewidth=1)[0],ax.plot([],[],color='orange',linewidth=1)[0]]
+    ax.set_title('DQN Learning Progress (Tic-Tac-Toe)')
+    ax.set_xlabel('Eval')
+   else:
+    lines = [ax.plot([],[])[0],ax.plot([],[])[0]]
+   self.figures[kind] = (fig,ax,lines)
+  return self.figures[kind]
+
  def plot(self,file_name,plot_name):
-  tuples = []
-  with open(file_name, "r") as f:
-     for line in f:
-        line = line.strip()
-        if line:
-            tuples.append(ast.literal_eval(line))
-
-  wins_rl_asfp = []
-  wins_rl_assp = []
-  for x,y in tuples:
-   wins_rl_asfp.append(x)
-   wins_rl_assp.append(y)
+  if file_name.endswith(".txt"): # old logs with one (first, second) tuple per line
+   tuples = []
+   with open(file_name, "r") as f:
+      for line in f:
+         line = line.strip()
+         if line:
+             tuples.append(ast.literal_eval(line))
+
+   wins_rl_asfp = []
+   wins_rl_assp = []
+   for x,y in tuples:
+    wins_rl_asfp.append(x)
+    wins_rl_assp.append(y)
+  else:
+   if file_name not in self.readers:
+    self.readers[file_name] = MetricsReader(file_name)
+   reader = self.readers[file_name]
+   reader.read()
+   wins_rl_asfp = reader.records["wins_rl"][:,0]
+   wins_rl_assp = reader.records["wins_rl"][:,1]
 
   x_axis = range(len(wins_rl_asfp))
-  plt.figure(figsize=(16,9))
-  plt.plot(x_axis,wins_rl_asfp)
-  plt.plot(x_axis,wins_rl_assp)
-  plt.savefig(plot_name)
+  fig,ax,lines = self.figure("plot")
+  lines[0].set_data(x_axis,wins_rl_asfp)
+  lines[1].set_data(x_axis,wins_rl_assp)
+  ax.relim()
+  ax.autoscale_view()
+  fig.savefig(plot_name)
+
+ def avg_plot(self,moving_avg_1,moving_avg_2,window,plot_name):
+    fig,ax,lines = self.figure("avg_plot")
+    for line,moving_avg in zip(lines,(moving_avg_1,moving_avg_2)):
+        line.set_data(range(len(moving_avg)),moving_avg)
+        line.set_label(f'{window}-Game Average')
+    ax.set_ylabel(f'Avg win rate over last {window} tests')
+    ax.legend()
+    ax.relim()
+    ax.autoscale_view()
+    fig.savefig(plot_name)
+
+ def close(self):
+  for fig,_,_ in self.figures.values():
+   plt.close(fig)
+  self.figures = {}
+
+def memory_use():
+ ## resident set size of the calling process in bytes, 0 where /proc is not available
+ try:
+  with open("/proc/self/statm") as f:
+   return int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+ except (OSError,ValueError,AttributeError):
+  return 0
+
+def serve(requests,status):
+ ## render requests until a None arrives; whatever queued up while a plot was being drawn is
+ ## coalesced to the latest request per output file
+ Logger = logger()
+ running = True
+ while running:
+  batch = [requests.get()]
+  while True:
+   try:
+    batch.append(requests.get_nowait())
+   except queue.Empty:
+    break
+  pending = {}
+  for request in batch:
+   if request is None:
+    running = False
+   else:
+    pending[request[1][-1]] = request # keyed by plot_name
+  for method,args in pending.values():
+   getattr(Logger,method)(*args)
+  status[0] += len(pending)
+  status[1] += len(batch) - len(pending) - (not running)
+  status[2] = memory_use()
+ Logger.close()
+
+class plot_service:
+ ## logger.plot/avg_plot in a separate process, the calls return at once
+ def __init__(self):
+  self.requests = mp.Queue()
+  self.status = mp.Array('q',3,lock=False) # plots rendered, requests coalesced, renderer memory in bytes
+  self.process = mp.Process(target=serve,args=(self.requests,self.status),daemon=True)
+  self.process.start()
+
+ def plot(self,file_name,plot_name):
+  self.requests.put(("plot",(file_name,plot_name)))
 
  def avg_plot(self,moving_avg_1,moving_avg_2,window,plot_name):
-    plt.figure(figsize=(16,9))
-    plt.plot(moving_avg_1, label=f'{window}-Game Average', color='blue', linewidth=1)
-    plt.plot(moving_avg_2, label=f'{window}-Game Average', color='orange', linewidth=1)
-    plt.title('DQN Learning Progress (Tic-Tac-Toe)')
-    plt.xlabel('Eval')
-    plt.ylabel(f'Avg win rate over last {window} tests')
-    plt.legend()
-    plt.savefig(plot_name)
+  self.requests.put(("avg_plot",(list(moving_avg_1),list(moving_avg_2),window,plot_name)))
+
+ def stats(self):
+  return {"rendered": self.status[0],"coalesced": self.status[1],"memory": self.status[2]}
 
+ def close(self):
+  ## renders what is still queued and waits for the process
+  self.requests.put(None)
+  self.process.join()
+  return self.stats()
@@ -0,0 +1,207 @@
+import numpy as np
+import random
+import os
+import pickle
+import time
+from functools import partial
+from game import Game
+from player import RLPlayer, match_maker
+from evaluate import exact_rates, greedy_move, BackgroundEvaluator
+from solver import solved_game
+from qtable import save_qtable
+from metrics import MetricsWriter
+from replay import ReplayBuffer, PrioritizedReplayBuffer, replay_update
+from symmetry import DIGITS
+from test import plot_service
+
+NO_MOVES = np.zeros(9,dtype=bool) # next_legal of a finished game
+
+def epsilon_greedy_move(qtable,game:Game,epsilon):
+    if np.random.rand() < epsilon:
+        return random.choice(game.legal_moves()) # random move
+    return greedy_move(qtable,game)
+
+def play_episode(rlplayer,epsilon,alpha,gamma,on_policy=False,visited=None,replay_buffer=None):
+    ## one self-play game with the SARSA updates of the original scripts:
+    ## off-policy bootstraps from the greedy next action, on-policy from the epsilon-greedy one it then plays;
+    ## every transition also goes to replay_buffer when given, all of a game's in one add at its end
+    qtable = rlplayer.qtable
+    transitions = []
+    theGame = Game()
+    action = None
+    prev_state = None
+    prev_action = None
+
+    while theGame.game_status() == None:
+        player = theGame.current_player ## the player who takes the action
+        state = theGame.state_index()
+        if visited is not None:
+            visited.add(state)
+
+        if action is None:
+            action = epsilon_greedy_move(qtable,theGame,epsilon)
+        theGame.make_move(action//3,action%3)
+        next_state = theGame.state_index()
+        status = theGame.game_status()
+
+        if status is not None:
+            if status == 0:
+                reward,prev_reward = 0,0
+            elif status == player:
+                reward,prev_reward = 1,-1
+            else:
+                reward,prev_reward = -1,1
+            qtable[state][action] += alpha*(reward - qtable[state][action])
+            if prev_state is not None:
+                qtable[prev_state][prev_action] += alpha*(prev_reward - qtable[prev_state][prev_action])
+            if replay_buffer is not None:
+                transitions.append((state,action,reward,next_state,True,NO_MOVES))
+                if prev_state is not None:
+                    transitions.append((prev_state,prev_action,prev_reward,next_state,True,NO_MOVES))
+            na = None
+        else:
+            reward = 0
+            na = epsilon_greedy_move(qtable,theGame,epsilon) if on_policy else greedy_move(qtable,theGame)
+            qtable[state][action] += alpha*(reward - gamma*qtable[next_state][na] - qtable[state][action])
+            if replay_buffer is not None:
+                transitions.append((state,action,reward,next_state,False,DIGITS[next_state] == 0))
+
+        prev_state = state
+        prev_action = action
+        action = na if on_policy else None
+
+    if transitions:
+        replay_buffer.add(*map(np.array,zip(*transitions)))
+
+def test_rates(rlplayer,exact_eval=True,n_test_games=100):
+    ## (rl wins as first, as second), (opponent wins as first, as second), (draws with rl first, second) in percent
+    if exact_eval:
+        return exact_rates(rlplayer,"random")
+    match = match_maker()
+    rl_player_wins_asfp,draws_with_rl_asfp,p_player_wins_assp = match.create_random_matches(-1,rlplayer,n_test_games) ## rl player as first player
+    p_player_wins_asfp,draws_with_rl_assp,rl_player_wins_assp = match.create_random_matches(1,rlplayer,n_test_games) ## rl player as second player
+    return ((rl_player_wins_asfp*100/n_test_games,rl_player_wins_assp*100/n_test_games),
+            (p_player_wins_asfp*100/n_test_games,p_player_wins_assp*100/n_test_games),
+            (draws_with_rl_asfp*100/n_test_games,draws_with_rl_assp*100/n_test_games))
+
+def save_checkpoint(file_name,checkpoint):
+    tmp_name = f"{file_name}.{os.getpid()}.tmp"
+    with open(tmp_name,"wb") as f:
+        pickle.dump(checkpoint,f,protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_name,file_name)
+
+def load_checkpoint(file_name):
+    with open(file_name,"rb") as f:
+        return pickle.load(f)
+
+def interval_eval(rlplayer,exact_eval=True,n_test_games=100):
+    ## test_rates plus the draw rates against perfect play
+    return (*test_rates(rlplayer,exact_eval,n_test_games),exact_rates(rlplayer,"perfect")[2])
+
+def train(on_policy=False,tag="ofpol_v5",out_dir=".",epochs=200000,test_interval=100,
+          alpha=0.1,gamma=0.99,epsilon=1.0,epsilon_decay=0.9999885,min_epsilon=0.1,
+          symmetric=True,compact=False,exact_eval=True,n_test_games=100,seed=None,plot=True,verbose=True,
+          eval_interval=None,background_eval=True,max_pending_evals=2,checkpoint_interval=1000,resume=False,
+          cap=None,batch_size=32,prioritized=False):
+    ## the SARSA training loop of offpol_sarsa.py/onpol_sarsa.py, writing its files into out_dir
+    ## and returning the final metrics. The Q-table is saved every test_interval epochs and evaluated
+    ## every eval_interval epochs (test_interval by default), in a background process unless
+    ## background_eval is False; results are logged against the epoch of the evaluated table.
+    ## Evaluations are appended to metrics_sarsa_<tag>.metrics. Every checkpoint_interval epochs the full
+    ## trainer state (table, epsilon, epoch, RNG states and metrics log size) goes to
+    ## checkpoint_sarsa_<tag>.pkl, resume=True continues from it exactly.
+    ## With cap, the transitions of the last cap moves are kept in a replay buffer and a minibatch of
+    ## batch_size of them is replayed (with greedy next actions) after every episode, sampled by TD error
+    ## when prioritized.
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    os.makedirs(out_dir,exist_ok=True)
+    q_table_sarsa = os.path.join(out_dir,f"q_table_sarsa_{tag}.qtable")
+    metrics_sarsa = os.path.join(out_dir,f"metrics_sarsa_{tag}.metrics")
+    plot_sarsa = os.path.join(out_dir,f"plot_sarsa_{tag}.png")
+    checkpoint_sarsa = os.path.join(out_dir,f"checkpoint_sarsa_{tag}.pkl")
+
+    rlplayer = RLPlayer(symmetric=symmetric,compact=compact)
+    visited = set()
+    last = None # latest (rl wins, opponent wins, draws, draws against perfect play)
+    replay_buffer = None
+    if cap:
+        replay_buffer = (PrioritizedReplayBuffer if prioritized else ReplayBuffer)(cap,np.random.default_rng(seed))
+    eval_interval = eval_interval or test_interval
+    evaluate = partial(interval_eval,exact_eval=exact_eval,n_test_games=n_test_games)
+    evaluator = BackgroundEvaluator(evaluate,max_pending_evals) if background_eval else None
+    start = time.time()
+    first_epoch = 1
+    metrics_offset = None
+
+    if resume and os.path.exists(checkpoint_sarsa):
+        checkpoint = load_checkpoint(checkpoint_sarsa)
+        rlplayer.qtable.values[:] = checkpoint["qtable"]
+        epsilon = checkpoint["epsilon"]
+        first_epoch = checkpoint["epoch"] + 1
+        random.setstate(checkpoint["random_state"])
+        np.random.set_state(checkpoint["np_random_state"])
+        visited = checkpoint["visited"]
+        last,metrics_offset = checkpoint["last"],checkpoint["metrics_offset"]
+        replay_buffer = checkpoint["replay_buffer"]
+        if verbose:
+            print(f"Resuming {tag} from epoch {first_epoch}")
+    metrics = MetricsWriter(metrics_sarsa,metrics_offset)
+    plotter = plot_service() if plot else None
+
+    def record(results):
+        nonlocal last
+        for eval_epoch,last in results:
+            rl_rates,p_rates,draw_rates,perfect_draws = last
+            metrics.write(eval_epoch,*last)
+            if verbose:
+                print(f"This is {eval_epoch//eval_interval}th testing (epoch {eval_epoch})")
+                print(f"States explored = {len(visited)}")
+                print(f"rl wins = {rl_rates}, draws = {draw_rates}")
+                print(f"draws against perfect play = {perfect_draws}")
+        if results and plotter is not None:
+            plotter.plot(metrics_sarsa,plot_sarsa)
+
+    for epoch in range(first_epoch,epochs+1):
+        play_episode(rlplayer,epsilon,alpha,gamma,on_policy,visited,replay_buffer)
+        if replay_buffer is not None:
+            replay_update(rlplayer.qtable,replay_buffer,batch_size,alpha,gamma)
+
+        if epoch % eval_interval == 0:
+            if evaluator is not None:
+                evaluator.submit(epoch,rlplayer)
+            else:
+                record([(epoch,evaluate(rlplayer))])
+        if evaluator is not None:
+            record(evaluator.poll())
+
+        if epoch % test_interval == 0:
+            save_qtable(rlplayer.qtable,q_table_sarsa) ## writing the qtable
+
+        epsilon = max(epsilon*epsilon_decay,min_epsilon)
+
+        if epoch % checkpoint_interval == 0:
+            if evaluator is not None:
+                record(evaluator.wait()) # metrics up to this epoch belong in the checkpoint
+            save_checkpoint(checkpoint_sarsa,{"epoch": epoch,"epsilon": epsilon,"qtable": rlplayer.qtable.values,
+                                              "random_state": random.getstate(),"np_random_state": np.random.get_state(),
+                                              "visited": visited,"last": last,"metrics_offset": metrics.offset,
+                                              "replay_buffer": replay_buffer})
+
+    if evaluator is not None:
+        record(evaluator.close())
+    metrics.close()
+    if plotter is not None:
+        plot_stats = plotter.close()
+        if verbose:
+            print(f"{plot_stats['rendered']} plots, {plot_stats['coalesced']} coalesced, "
+                  f"plotter memory = {plot_stats['memory']/2**20:.1f} MiB")
+
+    return {"epochs": epochs,
+            "seconds": time.time() - start,
+            "states_explored": len(visited),
+            "wins_rl": last[0] if last else None,
+            "draws": last[2] if last else None,
+            "draws_vs_perfect": exact_rates(rlplayer,"perfect")[2],
+            "policy_accuracy": solved_game().policy_accuracy(rlplayer.qtable)}
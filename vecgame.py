@@ -0,0 +1,63 @@
+import numpy as np
+from game import WIN_LINES
+from symmetry import POW3
+
+LINES = np.array([[line >> i & 1 for i in range(9)] for line in WIN_LINES],dtype=np.int8).T # (9,8) cell -> line
+
+class VecGame:
+    ## n games side by side, boards use the same 1/-1/0 cells as Game.board (flattened)
+    def __init__(self,n_games,rng=None):
+        self.n_games = n_games
+        self.boards = np.zeros((n_games,9),dtype=np.int8)
+        self.current_player = np.ones(n_games,dtype=np.int8)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.index = np.arange(n_games)
+
+    def reset(self,games=None):
+        if games is None:
+            games = slice(None)
+        self.boards[games] = 0
+        self.current_player[games] = 1
+
+    def legal_mask(self):
+        return self.boards == 0
+
+    def make_moves(self,actions,games=None):
+        games = self.index if games is None else games
+        self.boards[games,actions] = self.current_player[games]
+        self.current_player[games] *= -1
+
+    def unmake_moves(self,actions,games=None):
+        games = self.index if games is None else games
+        self.boards[games,actions] = 0
+        self.current_player[games] *= -1
+
+    def game_status(self):
+        ## (done, winner) per game: winner is 1/-1 for a win and 0 for a draw or a running game
+        line_sums = self.boards @ LINES
+        x_wins = (line_sums == 3).any(axis=1)
+        o_wins = (line_sums == -3).any(axis=1)
+        winner = x_wins.astype(np.int8) - o_wins
+        done = x_wins | o_wins | (self.boards != 0).all(axis=1)
+        return done,winner
+
+    def state_index(self):
+        ## Game.state_index() of every board
+        return ((self.boards*self.current_player[:,None]) % 3).astype(np.int64) @ POW3
+
+    def random_actions(self):
+        ## one uniformly random legal move per board, -1 for full boards
+        scores = np.where(self.legal_mask(),self.rng.random((self.n_games,9)),-1.0)
+        actions = scores.argmax(axis=1)
+        return np.where(scores.max(axis=1) >= 0,actions,-1)
+
+    def greedy_actions(self,values):
+        ## argmax over legal moves of (n,9) action values, lowest cell on ties like the scalar loops
+        return np.where(self.legal_mask(),values,-np.inf).argmax(axis=1)
+
+    def step(self,actions):
+        ## play one move in every game, finished games are reported and then reset
+        self.make_moves(actions)
+        done,winner = self.game_status()
+        self.reset(done)
+        return done,winner